@@ -3,8 +3,6 @@
 Add Sample Notification Data
 """
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
 from dotenv import load_dotenv
 from pathlib import Path
 import uuid
@@ -13,11 +11,7 @@ from datetime import datetime, timedelta
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
-async def add_sample_notifications():
+async def add_sample_notifications(db):
     print("\n📬 Adding sample notification entries...")
     
     # Get users by role
@@ -125,11 +119,19 @@ async def add_sample_notifications():
     ]
     
     # Insert notifications
-    result = await db.notifications.insert_many(sample_notifications)
+    result = await db.notifications.insert_many(sample_notifications, ordered=False)
     print(f"✅ Added {len(result.inserted_ids)} sample notifications")
     print(f"   Admin: {admin_user['name']} - 3 notifications")
     print(f"   Parent: {parent_user['name']} - 3 notifications")
     print(f"   Teacher: {teacher_user['name']} - 3 notifications")
 
+async def main():
+    # Connect only when run as a script so importing this module opens no pool
+    from db import client, db
+    try:
+        await add_sample_notifications(db)
+    finally:
+        client.close()
+
 if __name__ == "__main__":
-    asyncio.run(add_sample_notifications())
+    asyncio.run(main())
@@ -6,10 +6,13 @@ when scans don't occur within the threshold time relative to expected stop arriv
 
 import asyncio
 import os
+import uuid
 import logging
+import pytz
 from datetime import datetime, timezone, timedelta
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import InsertOne, UpdateOne
 from dotenv import load_dotenv
+from db import client, db
 from pathlib import Path
 
 # Configure logging
@@ -25,14 +28,30 @@ logging.basicConfig(
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
 # Configuration
 RED_STATUS_THRESHOLD = int(os.environ.get('RED_STATUS_THRESHOLD', '10'))  # minutes
 CHECK_INTERVAL = 60  # Check every 60 seconds
+MAX_CHECK_INTERVAL = 300  # Longest back-off between checks while idle
+TIMEZONE = os.environ.get('TIMEZONE', 'Asia/Kolkata')
+# Local (TIMEZONE) hours covering the morning and evening trips; outside them idle checks back off
+DEFAULT_ACTIVE_HOURS = {5, 6, 7, 8, 9, 10, 13, 14, 15, 16, 17, 18}
+
+
+def parse_active_hours(raw: str) -> set:
+    """Parse a comma-separated hour list, falling back to the default when unset or invalid"""
+    if not raw.strip():
+        return DEFAULT_ACTIVE_HOURS
+    try:
+        hours = {int(h) for h in raw.split(',') if h.strip()}
+    except ValueError:
+        hours = None
+    if not hours or not all(0 <= h < 24 for h in hours):
+        logging.error(f"Invalid MONITOR_ACTIVE_HOURS {raw!r}, using default active hours")
+        return DEFAULT_ACTIVE_HOURS
+    return hours
+
+
+ACTIVE_HOURS = parse_active_hours(os.environ.get('MONITOR_ACTIVE_HOURS', ''))
 
 
 def parse_time(time_str: str) -> datetime.time:
@@ -47,10 +66,27 @@ def parse_time(time_str: str) -> datetime.time:
         return None
 
 
+def parse_last_update(value) -> datetime:
+    """Return last_update as an aware datetime, accepting BSON dates as well as ISO strings"""
+    last_update_time = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    if last_update_time.tzinfo is None:
+        # Stored without tz info, assume UTC
+        last_update_time = last_update_time.replace(tzinfo=timezone.utc)
+    return last_update_time
+
+
+async def ensure_indexes():
+    """Create the indexes the per-cycle queries rely on (idempotent)"""
+    # date + trip first so the bulk $in lookup scans one contiguous index range
+    await db.attendance.create_index([("date", 1), ("trip", 1), ("student_id", 1)])
+    await db.students.create_index("stop_id")
+
+
 async def check_missed_scans():
     """
     Check for students who should have been scanned but weren't.
     Mark their attendance as RED if threshold exceeded.
+    Returns the number of students marked RED.
     """
     current_time = datetime.now(timezone.utc)
     current_hour = current_time.hour
@@ -62,69 +98,85 @@ async def check_missed_scans():
     
     logging.info(f"Checking missed scans for {today} {trip} trip (is_morning={is_morning})")
     
-    # Get all students with their assigned routes and stops
-    students_cursor = db.students.find({
-        "stop_id": {"$exists": True, "$ne": None}
-    })
+    # Values shared by every stop and student this cycle
+    today_date = current_time.date()
+    threshold_td = timedelta(minutes=RED_STATUS_THRESHOLD)
+    current_time_iso = current_time.isoformat()
+    
+    # Load every stop once, projecting only the expected time for this trip
+    expected_field = 'morning_expected_time' if is_morning else 'evening_expected_time'
+    stops = await db.stops.find({}, {"stop_id": 1, expected_field: 1, "_id": 0}).to_list(None)
+    
+    # Find stops whose expected time + threshold has already passed
+    ready_stops = {}
+    for stop in stops:
+        stop_id = stop['stop_id']
+        # Get expected time based on trip direction
+        expected_time_str = stop.get(expected_field)
+        if not expected_time_str:
+            # No expected time configured for this stop/direction, skip
+            continue
+        
+        # Parse expected time
+        expected_time = parse_time(expected_time_str)
+        if not expected_time:
+            continue
+        
+        # Calculate threshold time (expected time + threshold minutes)
+        threshold_datetime = datetime.combine(today_date, expected_time, tzinfo=current_time.tzinfo) + threshold_td
+        
+        # Only stops past the threshold need their students checked
+        if current_time >= threshold_datetime:
+            ready_stops[stop_id] = (expected_time_str, threshold_datetime)
+    
+    if not ready_stops:
+        logging.debug(f"Scan check complete: no stops past threshold for {trip} trip")
+        return 0
+    
+    # Only students at those stops need checking
+    students = await db.students.find(
+        {"stop_id": {"$in": list(ready_stops)}},
+        {"student_id": 1, "stop_id": 1, "_id": 0}
+    ).to_list(None)
+    
+    # Load today's attendance for this trip in one query, keyed by student
+    student_ids = [s['student_id'] for s in students]
+    existing = await db.attendance.find({
+        "date": today,
+        "trip": trip,
+        "student_id": {"$in": student_ids}
+    }, {"student_id": 1, "status": 1, "last_update": 1, "_id": 0}).to_list(None)
+    att_by_sid = {a['student_id']: a for a in existing}
     
     checked_count = 0
     marked_red_count = 0
+    ops = []  # RED writes, flushed in a single bulk_write
     
-    async for student in students_cursor:
+    def process_student(student):
+        nonlocal checked_count, marked_red_count
         try:
             student_id = student['student_id']
-            stop_id = student.get('stop_id')
-            
-            if not stop_id:
-                continue
-            
-            # Get stop details with expected times
-            stop = await db.stops.find_one({"stop_id": stop_id}, {"_id": 0})
-            if not stop:
-                continue
-            
-            # Get expected time based on trip direction
-            expected_time_str = stop.get('morning_expected_time') if is_morning else stop.get('evening_expected_time')
-            if not expected_time_str:
-                # No expected time configured for this stop/direction, skip
-                continue
-            
-            # Parse expected time
-            expected_time = parse_time(expected_time_str)
-            if not expected_time:
-                continue
-            
-            # Calculate threshold time (expected time + threshold minutes)
-            expected_datetime = datetime.combine(current_time.date(), expected_time)
-            threshold_datetime = expected_datetime + timedelta(minutes=RED_STATUS_THRESHOLD)
-            
-            # Check if we're past the threshold
-            if current_time < threshold_datetime:
-                # Still within acceptable time window, skip
-                continue
+            expected_time_str, threshold_datetime = ready_stops[student['stop_id']]
             
             checked_count += 1
             
             # Check if student has attendance record for today's trip
-            attendance = await db.attendance.find_one({
-                "student_id": student_id,
-                "date": today,
-                "trip": trip
-            })
+            attendance = att_by_sid.get(student_id)
             
             if not attendance:
                 # No scan at all - mark as RED
-                # Create RED status attendance record
-                from server import Attendance
-                red_attendance = Attendance(
-                    student_id=student_id,
-                    date=today,
-                    trip=trip,
-                    status="red",
-                    confidence=0.0,
-                    last_update=current_time.isoformat()
-                )
-                await db.attendance.insert_one(red_attendance.model_dump())
+                # Create RED status attendance record (same shape as server.Attendance)
+                ops.append(InsertOne({
+                    "attendance_id": str(uuid.uuid4()),
+                    "student_id": student_id,
+                    "date": today,
+                    "trip": trip,
+                    "status": "red",
+                    "confidence": 0.0,
+                    "last_update": current_time_iso,
+                    "scan_photo": None,
+                    "scan_timestamp": None
+                }))
                 marked_red_count += 1
                 logging.warning(f"Marked RED: Student {student_id} - No scan for {trip} trip (expected at {expected_time_str}, threshold passed at {threshold_datetime.strftime('%H:%M')})")
             
@@ -133,15 +185,15 @@ async def check_missed_scans():
                 # Check if enough time has passed since first scan
                 last_update = attendance.get('last_update')
                 if last_update:
-                    last_update_time = datetime.fromisoformat(last_update)
+                    last_update_time = parse_last_update(last_update)
                     # If student has been "yellow" for longer than threshold, mark as RED
                     yellow_duration = (current_time - last_update_time).total_seconds() / 60  # minutes
                     
                     if yellow_duration > RED_STATUS_THRESHOLD:
-                        await db.attendance.update_one(
+                        ops.append(UpdateOne(
                             {"student_id": student_id, "date": today, "trip": trip},
-                            {"$set": {"status": "red", "last_update": current_time.isoformat()}}
-                        )
+                            {"$set": {"status": "red", "last_update": current_time_iso}}
+                        ))
                         marked_red_count += 1
                         logging.warning(f"Marked RED: Student {student_id} - Incomplete journey, yellow status for {yellow_duration:.1f} minutes (threshold: {RED_STATUS_THRESHOLD} min)")
             
@@ -149,12 +201,21 @@ async def check_missed_scans():
             
         except Exception as e:
             logging.error(f"Error checking student {student.get('student_id')}: {e}")
-            continue
+    
+    # Per-student checks only queue writes, so a plain loop is enough
+    for student in students:
+        process_student(student)
+    
+    if ops:
+        result = await db.attendance.bulk_write(ops, ordered=False)
+        logging.info(f"RED writes applied: {result.inserted_count} inserted, {result.modified_count} updated")
     
     if marked_red_count > 0:
         logging.info(f"Scan check complete: {checked_count} students checked, {marked_red_count} marked RED")
     else:
         logging.debug(f"Scan check complete: {checked_count} students checked, no RED marks needed")
+    
+    return marked_red_count
 
 
 async def monitor_attendance():
@@ -164,13 +225,25 @@ async def monitor_attendance():
     logging.info("=" * 60)
     logging.info(f"Configuration:")
     logging.info(f"  • RED Status Threshold: {RED_STATUS_THRESHOLD} minutes")
-    logging.info(f"  • Check Interval: {CHECK_INTERVAL} seconds")
+    logging.info(f"  • Check Interval: {CHECK_INTERVAL} seconds (up to {MAX_CHECK_INTERVAL} when idle)")
     logging.info("=" * 60)
     
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        logging.error(f"Index creation failed: {e}")
+    
+    sleep_interval = CHECK_INTERVAL
     while True:
         try:
-            await check_missed_scans()
-            await asyncio.sleep(CHECK_INTERVAL)
+            marked_red_count = await check_missed_scans()
+            
+            # Back off while nothing happens outside trip hours, reset on activity
+            if marked_red_count == 0 and datetime.now(pytz.timezone(TIMEZONE)).hour not in ACTIVE_HOURS:
+                sleep_interval = min(sleep_interval * 2, MAX_CHECK_INTERVAL)
+            else:
+                sleep_interval = CHECK_INTERVAL
+            await asyncio.sleep(sleep_interval)
         except KeyboardInterrupt:
             logging.info("\n🛑 Monitor stopped by user")
             break
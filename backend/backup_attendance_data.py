@@ -5,25 +5,21 @@ Includes: attendance, events (scan events), and attendance photo references
 """
 
 import asyncio
-import json
 import os
+import orjson
 from datetime import datetime
 from pathlib import Path
-from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
+from db import client, db
 from typing import List, Dict, Any
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
 # Backup configuration
 ATTENDANCE_BACKUP_DIR = ROOT_DIR / 'backups' / 'attendance'
 BACKUP_LIMIT = int(os.environ.get('BACKUP_LIMIT', '3'))
+BACKUP_CURSOR_BATCH_SIZE = int(os.environ.get('BACKUP_CURSOR_BATCH_SIZE', '5000'))  # Documents per getMore
 
 # Collections to backup (attendance-specific only)
 ATTENDANCE_COLLECTIONS = [
@@ -40,10 +36,16 @@ def ensure_backup_directory():
 
 def get_backup_files() -> List[Path]:
     """Get all attendance backup files sorted by timestamp (newest first)"""
-    if not ATTENDANCE_BACKUP_DIR.exists():
+    # One scandir pass; the name check needs no per-entry Path or stat
+    try:
+        with os.scandir(ATTENDANCE_BACKUP_DIR) as it:
+            backup_files = [
+                Path(entry.path) for entry in it
+                if entry.name.startswith('attendance_backup_') and entry.name.endswith('.json')
+            ]
+    except FileNotFoundError:
         return []
     
-    backup_files = list(ATTENDANCE_BACKUP_DIR.glob('attendance_backup_*.json'))
     # Sort by filename (which includes timestamp) in descending order
     backup_files.sort(reverse=True)
     return backup_files
@@ -61,58 +63,73 @@ def rotate_backups():
     files_to_delete = backup_files[BACKUP_LIMIT:]
     print(f"\n🔄 Rotating attendance backups: keeping {BACKUP_LIMIT} most recent, deleting {len(files_to_delete)} old file(s)")
     
+    remaining = len(backup_files)
     for backup_file in files_to_delete:
         try:
             backup_file.unlink()
+            remaining -= 1
             print(f"   🗑️  Deleted: {backup_file.name}")
         except Exception as e:
             print(f"   ⚠️  Failed to delete {backup_file.name}: {e}")
     
-    print(f"✅ Attendance backup rotation complete: {len(get_backup_files())}/{BACKUP_LIMIT} backups remaining")
+    print(f"✅ Attendance backup rotation complete: {remaining}/{BACKUP_LIMIT} backups remaining")
+
+
+def write_backup(backup_path: Path, backup_data: Dict[str, Any]):
+    """Write backup JSON incrementally, encoding one document at a time"""
+    with open(backup_path, 'wb') as f:
+        f.write(b'{')
+        for i, (key, value) in enumerate(backup_data.items()):
+            if i:
+                f.write(b',')
+            f.write(orjson.dumps(key) + b':')
+            if key != 'collections':
+                f.write(orjson.dumps(value, default=str))
+                continue
+            
+            # Stream each collection's documents instead of encoding the whole list at once
+            f.write(b'{')
+            for j, (collection_name, documents) in enumerate(value.items()):
+                if j:
+                    f.write(b',')
+                f.write(orjson.dumps(collection_name) + b':[')
+                for k, doc in enumerate(documents):
+                    if k:
+                        f.write(b',')
+                    f.write(orjson.dumps(doc, default=str))
+                f.write(b']')
+            f.write(b'}')
+        f.write(b'}')
 
 
 async def export_collection(collection_name: str) -> List[Dict[str, Any]]:
     """Export all documents from a collection"""
-    documents = []
-    cursor = db[collection_name].find({})
-    
-    async for doc in cursor:
-        # Convert ObjectId to string if present
-        if '_id' in doc:
-            doc['_id'] = str(doc['_id'])
-        documents.append(doc)
-    
-    return documents
+    cursor = db[collection_name].find({}, batch_size=BACKUP_CURSOR_BATCH_SIZE)
+    # ObjectId values are stringified by write_backup's orjson default=str
+    return await cursor.to_list(None)
 
 
 async def collect_attendance_photo_references() -> Dict[str, Any]:
     """Collect all photo references from attendance records"""
-    photo_refs = {
-        'scan_photos': [],
-        'student_attendance_folders': []
+    # Scan photos from attendance records, shaped server-side into reference entries
+    scan_pipeline = [
+        {"$match": {"scan_photo": {"$exists": True, "$nin": [None, ""]}}},
+        {"$project": {"_id": 0, "attendance_id": 1, "student_id": 1, "date": 1, "photo_url": "$scan_photo"}}
+    ]
+    # Attendance folders from students collection
+    folder_pipeline = [
+        {"$match": {"attendance_path": {"$exists": True, "$nin": [None, ""]}}},
+        {"$project": {"_id": 0, "student_id": 1, "attendance_path": 1}}
+    ]
+    scan_photos, folders = await asyncio.gather(
+        db.attendance.aggregate(scan_pipeline).to_list(None),
+        db.students.aggregate(folder_pipeline).to_list(None)
+    )
+    
+    return {
+        'scan_photos': scan_photos,
+        'student_attendance_folders': folders
     }
-    
-    # Get unique scan photos from attendance records
-    cursor = db.attendance.find({"scan_photo": {"$exists": True, "$ne": None}})
-    async for record in cursor:
-        if record.get('scan_photo'):
-            photo_refs['scan_photos'].append({
-                'attendance_id': record.get('attendance_id'),
-                'student_id': record.get('student_id'),
-                'date': record.get('date'),
-                'photo_url': record.get('scan_photo')
-            })
-    
-    # Get student attendance folders from students collection
-    cursor = db.students.find({"attendance_path": {"$exists": True, "$ne": None}})
-    async for student in cursor:
-        if student.get('attendance_path'):
-            photo_refs['student_attendance_folders'].append({
-                'student_id': student.get('student_id'),
-                'attendance_path': student.get('attendance_path')
-            })
-    
-    return photo_refs
 
 
 async def create_backup():
@@ -136,42 +153,48 @@ async def create_backup():
         'photo_references': {}
     }
     
+    # Export collections and collect photo references concurrently
+    results = await asyncio.gather(
+        *[export_collection(c) for c in ATTENDANCE_COLLECTIONS],
+        collect_attendance_photo_references(),
+        return_exceptions=True
+    )
+    *export_results, photo_refs = results
+    
     print("\n📦 Exporting attendance collections:")
-    for collection_name in ATTENDANCE_COLLECTIONS:
-        try:
-            documents = await export_collection(collection_name)
+    for collection_name, documents in zip(ATTENDANCE_COLLECTIONS, export_results):
+        if isinstance(documents, Exception):
+            print(f"   ⚠️  {collection_name}: Export failed - {documents}")
+            backup_data['collections'][collection_name] = []
+        else:
             backup_data['collections'][collection_name] = documents
             print(f"   ✅ {collection_name}: {len(documents)} document(s)")
-        except Exception as e:
-            print(f"   ⚠️  {collection_name}: Export failed - {e}")
-            backup_data['collections'][collection_name] = []
     
     # Collect attendance photo references
     print("\n📸 Collecting attendance photo references:")
-    try:
-        photo_refs = await collect_attendance_photo_references()
+    if isinstance(photo_refs, Exception):
+        print(f"   ⚠️  Photo reference collection failed - {photo_refs}")
+        backup_data['photo_references'] = {'scan_photos': [], 'student_attendance_folders': []}
+    else:
         backup_data['photo_references'] = photo_refs
         print(f"   ✅ Scan photos: {len(photo_refs['scan_photos'])} reference(s)")
         print(f"   ✅ Attendance folders: {len(photo_refs['student_attendance_folders'])} folder(s)")
-    except Exception as e:
-        print(f"   ⚠️  Photo reference collection failed - {e}")
-        backup_data['photo_references'] = {'scan_photos': [], 'student_attendance_folders': []}
     
     # Save to JSON file
     try:
-        with open(backup_path, 'w') as f:
-            json.dump(backup_data, f, indent=2, default=str)
+        # File I/O runs in a worker thread so the event loop stays responsive
+        await asyncio.to_thread(write_backup, backup_path, backup_data)
         print(f"\n✅ Attendance backup created successfully: {backup_filename}")
         print(f"   📍 Location: {backup_path}")
         
-        file_size = backup_path.stat().st_size / 1024  # KB
+        file_size = (await asyncio.to_thread(backup_path.stat)).st_size / 1024  # KB
         print(f"   📊 Size: {file_size:.2f} KB")
     except Exception as e:
         print(f"\n❌ Failed to save attendance backup: {e}")
         raise
     
     # Rotate old backups
-    rotate_backups()
+    await asyncio.to_thread(rotate_backups)
     
     return backup_filename
 
@@ -0,0 +1,24 @@
+"""
+Shared MongoDB Connection
+Single Motor client reused by the standalone scripts (attendance monitor, backups, samples, photo restore)
+so each process keeps one connection pool and one topology monitor.
+"""
+
+import os
+from pathlib import Path
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# MongoDB connection
+mongo_url = os.environ['MONGO_URL']
+# minPoolSize keeps a few sockets open so the first query doesn't pay connection setup
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=int(os.environ.get('MONGO_MAX_POOL', '20')),
+    minPoolSize=int(os.environ.get('MONGO_MIN_POOL', '5')),
+    waitQueueTimeoutMS=5000
+)
+db = client[os.environ['DB_NAME']]
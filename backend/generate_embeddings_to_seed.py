@@ -4,31 +4,54 @@ Script to generate face embeddings for all students and store them in the seed b
 Run this before starting the backend to ensure all students have embeddings in the seed data.
 """
 
-import json
+import orjson
 import sys
 import os
 import shutil
 from pathlib import Path
-from datetime import datetime
 import asyncio
 import base64
 import numpy as np
-from deepface import DeepFace
-import cv2
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
 
 ROOT_DIR = Path(__file__).parent
 BACKUP_DIR = ROOT_DIR / 'backups'
 PHOTO_DIR = ROOT_DIR / 'photos'
+EMBEDDING_MIN_SIDE = int(os.environ.get('EMBEDDING_MIN_SIDE', '640'))  # Smallest image side kept when decoding large photos at reduced scale
+EMBEDDING_WORKERS = int(os.environ.get('EMBEDDING_WORKERS', str(min(4, os.cpu_count() or 1))))  # Each worker loads its own Facenet model
+
+
+def _imread_flag(image_path):
+    """Largest JPEG decode reduction that keeps the smaller image side >= EMBEDDING_MIN_SIDE."""
+    import cv2
+    from PIL import Image
+    
+    try:
+        # PIL only reads the header here, the pixels are decoded by OpenCV
+        with Image.open(image_path) as im:
+            min_side = min(im.size)
+    except Exception:
+        return cv2.IMREAD_COLOR
+    
+    for factor, flag in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2)):
+        if min_side // factor >= EMBEDDING_MIN_SIDE:
+            return flag
+    return cv2.IMREAD_COLOR
 
 
 def generate_face_embedding(image_path):
     """Generate face embedding from image using DeepFace."""
+    # Imported here so each worker process initialises TensorFlow itself (it is not fork-safe)
+    from deepface import DeepFace
+    import cv2
+    
     try:
         if not image_path.exists():
             return {"success": False, "embedding": None, "message": "Photo file not found"}
         
-        # Read image
-        img = cv2.imread(str(image_path))
+        # Read image, skipping full-resolution decode for large photos (Facenet works on 160x160 crops)
+        img = cv2.imread(str(image_path), _imread_flag(image_path))
         if img is None:
             return {"success": False, "embedding": None, "message": "Could not read image file"}
         
@@ -69,15 +92,39 @@ def generate_face_embedding(image_path):
         return {"success": False, "embedding": None, "message": f"Error: {str(e)}"}
 
 
+def _init_worker():
+    """Load the Facenet model once per worker so no job pays the model build"""
+    from deepface import DeepFace
+    DeepFace.build_model("Facenet")
+
+
+def _embed_one(job):
+    """Worker entry point: (student index, photo path) -> (student index, result)"""
+    idx, photo_path = job
+    return idx, generate_face_embedding(photo_path)
+
+
 def find_latest_seed_file():
     """Find the latest seed backup file."""
-    seed_files = list(BACKUP_DIR.glob('seed_backup_*.json'))
-    if not seed_files:
+    latest = None
+    latest_mtime = -1.0
+    # Single scandir pass; DirEntry.stat() reuses the directory read instead of a fresh lookup per path
+    try:
+        with os.scandir(BACKUP_DIR) as it:
+            for entry in it:
+                if not (entry.name.startswith('seed_backup_') and entry.name.endswith('.json')):
+                    continue
+                mtime = entry.stat().st_mtime
+                if mtime > latest_mtime:
+                    latest_mtime, latest = mtime, entry.path
+    except FileNotFoundError:
+        pass
+    
+    if latest is None:
         print("❌ No seed backup files found")
         sys.exit(1)
     
-    latest = max(seed_files, key=lambda p: p.stat().st_mtime)
-    return latest
+    return Path(latest)
 
 
 async def main():
@@ -88,15 +135,9 @@ async def main():
     seed_file = find_latest_seed_file()
     print(f"📁 Using seed file: {seed_file.name}")
     
-    # Create backup of current seed file
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = seed_file.parent / f"{seed_file.stem}.bak"
-    shutil.copy2(seed_file, backup_file)
-    print(f"💾 Backup created: {backup_file.name}")
-    
     # Load seed data
-    with open(seed_file, 'r') as f:
-        seed_data = json.load(f)
+    with open(seed_file, 'rb') as f:
+        seed_data = orjson.loads(f.read())
     
     students = seed_data.get('collections', {}).get('students', [])
     print(f"👥 Found {len(students)} students in seed file")
@@ -106,24 +147,27 @@ async def main():
     successful = 0
     failed = 0
     skipped = 0
+    dirty = False
     
+    # Work out which students need an embedding, then generate them in parallel
+    jobs = []
     for idx, student in enumerate(students, 1):
         student_id = student.get('student_id')
         student_name = student.get('name', 'Unknown')
         photo_url = student.get('photo', '')
         
-        print(f"\n[{idx}/{len(students)}] {student_name} ({student_id})")
-        
-        # Check if already has embedding
+        # Check if already has embedding (counted in the summary, not printed per student)
         if student.get('embedding'):
-            print(f"    ⏭️  Already has embedding, skipping")
             skipped += 1
             continue
         
         # Check if has photo
         if not photo_url:
+            print(f"[{idx}/{len(students)}] {student_name} ({student_id})")
             print(f"    ⚠️  No photo URL, storing null")
-            student['embedding'] = None
+            if 'embedding' not in student:
+                student['embedding'] = None
+                dirty = True
             failed += 1
             continue
         
@@ -135,22 +179,32 @@ async def main():
         else:
             photo_path = PHOTO_DIR / photo_url
         
-        # Generate embedding
-        result = generate_face_embedding(photo_path)
+        jobs.append((idx, photo_path))
+    
+    results = {}
+    if jobs:
+        print(f"\n🧠 Generating {len(jobs)} embedding(s) with {EMBEDDING_WORKERS} worker(s)...")
+        with ProcessPoolExecutor(max_workers=EMBEDDING_WORKERS, initializer=_init_worker) as executor:
+            # One progress bar instead of a line per student
+            results = dict(tqdm(executor.map(_embed_one, jobs, chunksize=4), total=len(jobs), desc="   Embeddings"))
+    
+    # Apply results in student order so output stays deterministic; only failures are printed
+    for idx, _ in jobs:
+        student = students[idx - 1]
+        result = results[idx]
+        
+        embedding = result['embedding'] if result['success'] else None
+        if 'embedding' not in student or student['embedding'] != embedding:
+            student['embedding'] = embedding
+            dirty = True
         
         if result['success']:
-            student['embedding'] = result['embedding']
-            print(f"    ✅ {result['message']}")
             successful += 1
         else:
-            student['embedding'] = None
+            print(f"[{idx}/{len(students)}] {student.get('name', 'Unknown')} ({student.get('student_id')})")
             print(f"    ❌ {result['message']}")
             failed += 1
     
-    # Save updated seed data
-    with open(seed_file, 'w') as f:
-        json.dump(seed_data, f, indent=2)
-    
     print("\n" + "=" * 60)
     print("📊 SUMMARY:")
     print(f"   ✅ Successful: {successful}")
@@ -158,6 +212,29 @@ async def main():
     print(f"   ⏭️  Skipped: {skipped}")
     print(f"   📝 Total: {len(students)}")
     print("=" * 60)
+    
+    # Nothing changed: leave the seed file (and its .bak) untouched
+    if not dirty:
+        print(f"✨ No changes, seed file left as is: {seed_file.name}")
+        return
+    
+    # Create backup of current seed file
+    # A hardlink is instant; it keeps the old content because the new data is written to a fresh inode below
+    backup_file = seed_file.parent / f"{seed_file.stem}.bak"
+    backup_file.unlink(missing_ok=True)
+    try:
+        os.link(seed_file, backup_file)
+    except OSError:
+        shutil.copy2(seed_file, backup_file)
+    print(f"💾 Backup created: {backup_file.name}")
+    
+    # Save updated seed data (write a temp file and swap it in, never truncate the linked inode)
+    tmp_file = seed_file.with_name(seed_file.name + '.tmp')
+    with open(tmp_file, 'wb') as f:
+        # Compact like BackupManager's own writers; the seed file is only read programmatically
+        f.write(orjson.dumps(seed_data, option=orjson.OPT_SERIALIZE_NUMPY))
+    os.replace(tmp_file, seed_file)
+    
     print(f"💾 Updated seed file: {seed_file.name}")
     print(f"🔙 Backup available: {backup_file.name}")
     print("✨ Done!")
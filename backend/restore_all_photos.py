@@ -10,31 +10,34 @@ Usage:
 """
 
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
 from pathlib import Path
-import json
+from db import db
+from backup_manager import get_latest_json_backup, load_backup_collections
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import sys
 import argparse
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
+import shutil
 from PIL import Image
 import io
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
 # Directories
 BACKUP_DIR = ROOT_DIR / 'backups'
 PHOTO_DIR = ROOT_DIR / 'photos'
+PHOTO_STAT_WORKERS = int(os.environ.get('PHOTO_STAT_WORKERS', '32'))  # Threads checking student profile photos concurrently
+PLACEHOLDER_CONCURRENCY = int(os.environ.get('PLACEHOLDER_CONCURRENCY', '8'))  # Placeholder downloads in flight at once
+PROGRESS_INTERVAL = int(os.environ.get('PHOTO_PROGRESS_INTERVAL', '500'))  # Entities between progress lines
+ATTENDANCE_PLACEHOLDER_POOL = int(os.environ.get('ATTENDANCE_PLACEHOLDER_POOL', '20'))  # Distinct downloads shared by attendance placeholders
 
 # Entity configurations: role -> (photo_dir, path_format)
 ENTITY_CONFIGS = {
@@ -75,6 +78,15 @@ ENTITY_CONFIGS = {
     }
 }
 
+# One keep-alive connection pool for every placeholder download instead of a new TLS handshake per photo
+PLACEHOLDER_URL = "https://thispersondoesnotexist.com/"
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=PLACEHOLDER_CONCURRENCY,
+    max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
+))
+
 
 class PhotoRestoreStats:
     """Track restoration statistics"""
@@ -143,15 +155,28 @@ class PhotoRestoreStats:
 
 def get_latest_backup() -> Optional[Path]:
     """Find the most recent backup file"""
-    if not BACKUP_DIR.exists():
-        return None
-    
-    backup_files = list(BACKUP_DIR.glob('seed_backup_*.json'))
-    if not backup_files:
-        return None
-    
-    backup_files.sort(reverse=True)
-    return backup_files[0]
+    return get_latest_json_backup('main')
+
+
+def list_directory(directory: Path, dirs: Optional[bool] = False) -> set:
+    """Names of the files (or subdirectories, or both when dirs is None) in a directory, read with a single scandir"""
+    try:
+        with os.scandir(directory) as it:
+            if dirs is None:
+                return {entry.name for entry in it}
+            return {entry.name for entry in it if (entry.is_dir() if dirs else entry.is_file())}
+    except FileNotFoundError:
+        return set()
+
+
+def is_valid_image(file_path: Path) -> bool:
+    """Check that a photo file opens and verifies as an image"""
+    try:
+        with Image.open(file_path) as img:
+            img.verify()
+        return True
+    except Exception:
+        return False
 
 
 def generate_placeholder_image(entity_type: str, entity_id: str, entity_name: str) -> Optional[bytes]:
@@ -161,10 +186,8 @@ def generate_placeholder_image(entity_type: str, entity_id: str, entity_name: st
     """
     try:
         # Use thispersondoesnotexist.com API
-        url = "https://thispersondoesnotexist.com/"
-        
         # Add random parameter to prevent caching
-        response = requests.get(url, timeout=10, params={'t': time.time()})
+        response = _http.get(PLACEHOLDER_URL, timeout=10, params={'t': time.time()})
         
         if response.status_code == 200:
             # Verify it's a valid image
@@ -194,47 +217,87 @@ def save_placeholder_image(file_path: Path, entity_type: str, entity_id: str, en
     image_bytes = generate_placeholder_image(entity_type, entity_id, entity_name)
     
     if image_bytes:
+        tmp_path = file_path.with_suffix(file_path.suffix + '.tmp')
         try:
             # Ensure directory exists
             file_path.parent.mkdir(parents=True, exist_ok=True)
             
-            # Save the image
-            with open(file_path, 'wb') as f:
+            # Save the image next to its destination and rename it into place,
+            # so an interrupted run never leaves a truncated JPEG behind
+            with open(tmp_path, 'wb') as f:
                 f.write(image_bytes)
+            os.replace(tmp_path, file_path)
             
             return True
         except Exception as e:
+            tmp_path.unlink(missing_ok=True)
             print(f"      ❌ Failed to save placeholder: {str(e)}")
             return False
     
     return False
 
 
-def ensure_directory_structure(entity_config: Dict, entity_id: str, stats: PhotoRestoreStats, entity_name: str) -> Path:
+async def save_placeholders(jobs: List[Tuple[Path, str, str, str]]) -> List[bool]:
+    """
+    Run save_placeholder_image for each (file_path, entity_type, entity_id, entity_name) job
+    on worker threads, with at most PLACEHOLDER_CONCURRENCY downloads in flight
+    """
+    semaphore = asyncio.Semaphore(PLACEHOLDER_CONCURRENCY)
+    
+    async def save_one(job):
+        async with semaphore:
+            return await asyncio.to_thread(save_placeholder_image, *job)
+    
+    return await asyncio.gather(*(save_one(job) for job in jobs))
+
+
+def copy_placeholders(pool: List[Path], file_paths: List[Path]) -> List[bool]:
+    """
+    Fill each path with a copy of an already-downloaded pool image, round-robin
+    Returns one success flag per path
+    """
+    if not pool:
+        return [False] * len(file_paths)
+    
+    results = []
+    for i, file_path in enumerate(file_paths):
+        tmp_path = file_path.with_suffix(file_path.suffix + '.tmp')
+        try:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            # A real copy, not a hardlink: a later scan overwrites the file in place
+            shutil.copyfile(pool[i % len(pool)], tmp_path)
+            os.replace(tmp_path, file_path)
+            results.append(True)
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
+            print(f"      ❌ Failed to copy placeholder: {str(e)}")
+            results.append(False)
+    
+    return results
+
+
+def ensure_directory_structure(entity_config: Dict, entity_id: str, stats: PhotoRestoreStats, entity_name: str, existing: Optional[set]) -> Path:
     """
     Ensure directory structure exists for an entity
+    `existing` is the snapshot of names in the entity's directory, or None if it does not exist yet
     """
     photo_dir = entity_config['photo_dir']
     
     if entity_config['has_subdirs']:
         # Students: /photos/students/{student_id}/
         entity_dir = photo_dir / entity_id
-        attendance_dir = entity_dir / 'attendance'
         
-        if not entity_dir.exists():
-            entity_dir.mkdir(parents=True, exist_ok=True)
-            stats.add(entity_name, 'directories_created')
+        # One mkdir -p on attendance/ also creates the student directory
+        if existing is None or 'attendance' not in existing:
+            (entity_dir / 'attendance').mkdir(parents=True, exist_ok=True)
         
-        if not attendance_dir.exists():
-            attendance_dir.mkdir(parents=True, exist_ok=True)
+        if existing is None:
+            stats.add(entity_name, 'directories_created')
         
         return entity_dir
     else:
         # Other entities: /photos/teachers/, /photos/parents/, etc.
-        if not photo_dir.exists():
-            photo_dir.mkdir(parents=True, exist_ok=True)
-            stats.add(entity_name, 'directories_created')
-        
+        # (the base directory is created before the entity loop)
         return photo_dir
 
 
@@ -252,6 +315,9 @@ async def restore_entity_photos(
     print(f"📸 PROCESSING {entity_name.upper()}")
     print(f"{'=' * 70}")
     
+    # Users are routed by the configured role (students have none)
+    role = entity_config.get('query', {}).get('role')
+    
     # Get entities from backup or database
     if entity_name == 'students':
         entities = backup_data.get('collections', {}).get('students', [])
@@ -260,7 +326,7 @@ async def restore_entity_photos(
         # For users (admins, teachers, parents)
         entities = [
             u for u in backup_data.get('collections', {}).get('users', [])
-            if u.get('role') == entity_name.rstrip('s')  # Remove plural
+            if u.get('role') == role
         ]
         collection = db.users
     
@@ -271,84 +337,128 @@ async def restore_entity_photos(
     print(f"📚 Found {len(entities)} {entity_name} in backup\n")
     
     # Ensure base directory exists
-    entity_config['photo_dir'].mkdir(parents=True, exist_ok=True)
+    photo_dir = entity_config['photo_dir']
+    photo_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Snapshot the photo directory once instead of stat-ing each entity's paths
+    has_subdirs = entity_config['has_subdirs']
+    if has_subdirs:
+        on_disk = {name: list_directory(photo_dir / name, dirs=None) for name in list_directory(photo_dir, dirs=True)}
+    else:
+        on_disk = list_directory(photo_dir)
+    
+    # Verify the photos already on disk in a thread pool (each verify reads the whole file)
+    on_disk_photos = []
+    for entity in entities:
+        entity_id = entity.get(entity_config['id_field'])
+        if not entity_id:
+            continue
+        file_path = entity_config['file_path'](entity_id)
+        names = on_disk.get(entity_id) if has_subdirs else on_disk
+        if names and file_path.name in names:
+            on_disk_photos.append(file_path)
+    with ThreadPoolExecutor(max_workers=PHOTO_STAT_WORKERS) as executor:
+        photo_valid = dict(zip(on_disk_photos, executor.map(is_valid_image, on_disk_photos)))
+    
+    # Fetch every entity's stored photo path in one query instead of a find_one per entity,
+    # so an already-linked run makes no per-entity database round trips; first match wins like find_one
+    id_field = entity_config['id_field']
+    lookup = {id_field: {'$in': [e[id_field] for e in entities if e.get(id_field)]}}
+    if role:
+        lookup['role'] = role
+    db_photos = {}
+    async for doc in collection.find(lookup, {'_id': 0, id_field: 1, 'photo': 1}):
+        db_photos.setdefault(doc[id_field], doc.get('photo'))
+    
+    # Missing photos are queued here and downloaded concurrently after the loop
+    placeholder_jobs = []
+    placeholder_labels = []
     
     # Process each entity
     for idx, entity in enumerate(entities, 1):
         entity_id = entity.get(entity_config['id_field'])
         entity_display_name = entity.get('name', 'Unknown')
         
-        print(f"[{idx}/{len(entities)}] {entity_display_name} ({entity_id[:20]}...)")
+        label = f"[{idx}/{len(entities)}] {entity_display_name}"
+        if idx % PROGRESS_INTERVAL == 0:
+            print(f"   ... {idx}/{len(entities)} processed")
         stats.add(entity_name, 'processed')
         
         if not entity_id:
-            print(f"   ⚠️  Skipping - no ID field")
+            print(f"{label} ⚠️  Skipping - no ID field")
             stats.errors.append(f"{entity_name}: {entity_display_name} - no ID")
             stats.add(entity_name, 'errors')
             continue
         
         # Step 1: Ensure directory structure
-        ensure_directory_structure(entity_config, entity_id, stats, entity_name)
+        existing = on_disk.get(entity_id) if has_subdirs else on_disk
+        ensure_directory_structure(entity_config, entity_id, stats, entity_name, existing)
+        if existing is None:
+            existing = on_disk[entity_id] = {'attendance'}
         
         # Step 2: Get file path
         file_path = entity_config['file_path'](entity_id)
         
         # Step 3: Check if photo exists
-        photo_exists = file_path.exists()
+        photo_exists = file_path.name in existing
         
         if photo_exists:
-            # Verify it's a valid image
-            try:
-                img = Image.open(file_path)
-                img.verify()
+            # Verified up front; photos generated earlier in this loop are valid
+            if photo_valid.get(file_path, True):
                 stats.add(entity_name, 'photos_verified')
-                print(f"   ✅ Photo verified")
-            except Exception as e:
-                print(f"   ⚠️  Photo corrupted, regenerating...")
+            else:
+                print(f"{label} ⚠️  Photo corrupted, regenerating...")
                 photo_exists = False
         
-        # Step 4: Generate placeholder if missing
+        # Step 4: Queue a placeholder if missing (a repeated ID then sees it as present)
         if not photo_exists and generate_placeholders:
-            print(f"   🎨 Generating placeholder from thispersondoesnotexist.com...")
-            if save_placeholder_image(file_path, entity_name, entity_id, entity_display_name):
-                stats.add(entity_name, 'photos_generated')
-                print(f"   ✅ Placeholder generated successfully")
-            else:
-                print(f"   ❌ Failed to generate placeholder")
-                stats.errors.append(f"{entity_name}: {entity_display_name} - placeholder generation failed")
-                stats.add(entity_name, 'errors')
+            placeholder_jobs.append((file_path, entity_name, entity_id, entity_display_name))
+            placeholder_labels.append((label, entity_display_name))
+            existing.add(file_path.name)
+            photo_valid[file_path] = True
         elif not photo_exists:
-            print(f"   ⚠️  Photo missing (placeholder generation disabled)")
+            print(f"{label} ⚠️  Photo missing (placeholder generation disabled)")
         
         # Step 5: Get correct photo path for database
         correct_path = entity_config['path_format'].format(id=entity_id)
         
         # Step 6: Update database if needed
-        query = {entity_config['id_field']: entity_id}
-        if entity_name != 'students':
-            query['role'] = entity_name.rstrip('s')
-        
-        db_entity = await collection.find_one(query)
-        
-        if db_entity:
-            current_path = db_entity.get('photo')
+        if entity_id in db_photos:
+            current_path = db_photos[entity_id]
             if current_path != correct_path:
+                query = {id_field: entity_id}
+                if role:
+                    query['role'] = role
                 try:
                     await collection.update_one(
                         query,
                         {"$set": {"photo": correct_path}}
                     )
+                    db_photos[entity_id] = correct_path
                     stats.add(entity_name, 'database_updated')
-                    print(f"   🔄 Database updated: {correct_path}")
                 except Exception as e:
                     error_msg = f"{entity_name}: {entity_display_name} - DB update failed: {str(e)}"
                     stats.errors.append(error_msg)
                     stats.add(entity_name, 'errors')
                     print(f"   ❌ {error_msg}")
         else:
-            print(f"   ⚠️  Not found in database")
+            print(f"{label} ⚠️  Not found in database")
             stats.errors.append(f"{entity_name}: {entity_display_name} - not in database")
             stats.add(entity_name, 'errors')
+    
+    # Step 4 (continued): download the queued placeholders
+    if placeholder_jobs:
+        print(f"\n🎨 Generating {len(placeholder_jobs)} placeholder(s) from thispersondoesnotexist.com...")
+        results = await save_placeholders(placeholder_jobs)
+        for (label, entity_display_name), saved in zip(placeholder_labels, results):
+            if saved:
+                stats.add(entity_name, 'photos_generated')
+            else:
+                print(f"{label} ❌ Failed to generate placeholder")
+                stats.errors.append(f"{entity_name}: {entity_display_name} - placeholder generation failed")
+                stats.add(entity_name, 'errors')
+    
+    print(f"\n✅ Processed {len(entities)} {entity_name}")
 
 
 async def restore_attendance_photos(stats: PhotoRestoreStats, generate_placeholders: bool = True) -> None:
@@ -374,6 +484,13 @@ async def restore_attendance_photos(stats: PhotoRestoreStats, generate_placehold
     
     print(f"📚 Found {len(attendance_records)} attendance records with photos\n")
     
+    # Each student's attendance folder is listed once, not stat'ed once per record
+    files_by_dir: Dict[Path, set] = {}
+    
+    # Missing photos are queued here and downloaded concurrently after the loop
+    placeholder_jobs = []
+    placeholder_labels = []
+    
     # Process each attendance record
     for idx, record in enumerate(attendance_records, 1):
         student_id = record.get('student_id')
@@ -381,6 +498,8 @@ async def restore_attendance_photos(stats: PhotoRestoreStats, generate_placehold
         trip = record.get('trip')
         scan_photo = record.get('scan_photo')
         
+        if idx % PROGRESS_INTERVAL == 0:
+            print(f"   ... {idx}/{len(attendance_records)} processed")
         if not student_id or not scan_photo:
             continue
         
@@ -397,7 +516,10 @@ async def restore_attendance_photos(stats: PhotoRestoreStats, generate_placehold
                 continue
             
             # Check if photo exists
-            photo_exists = file_path.exists()
+            photo_dir = file_path.parent
+            if photo_dir not in files_by_dir:
+                files_by_dir[photo_dir] = list_directory(photo_dir)
+            photo_exists = file_path.name in files_by_dir[photo_dir]
             
             if photo_exists:
                 # Verify it's a valid image
@@ -405,21 +527,15 @@ async def restore_attendance_photos(stats: PhotoRestoreStats, generate_placehold
                     img = Image.open(file_path)
                     img.verify()
                     stats.add(entity_name, 'photos_verified')
-                    if idx % 10 == 0:  # Print every 10th to avoid spam
-                        print(f"   [{idx}/{len(attendance_records)}] ✅ Verified")
                 except Exception as e:
                     print(f"   [{idx}/{len(attendance_records)}] ⚠️  Corrupted, regenerating...")
                     photo_exists = False
             
-            # Generate placeholder if missing
+            # Queue a placeholder if missing
             if not photo_exists and generate_placeholders:
-                print(f"   [{idx}/{len(attendance_records)}] 🎨 Generating placeholder for {date} {trip}...")
-                if save_placeholder_image(file_path, 'attendance', student_id, f'{date}_{trip}'):
-                    stats.add(entity_name, 'photos_generated')
-                    print(f"      ✅ Placeholder generated")
-                else:
-                    print(f"      ❌ Failed to generate placeholder")
-                    stats.add(entity_name, 'errors')
+                placeholder_jobs.append((file_path, 'attendance', student_id, f'{date}_{trip}'))
+                placeholder_labels.append(f"   [{idx}/{len(attendance_records)}] {date} {trip}")
+                files_by_dir[photo_dir].add(file_path.name)
             elif not photo_exists:
                 if idx % 10 == 0:
                     print(f"   [{idx}/{len(attendance_records)}] ⚠️  Photo missing (placeholder generation disabled)")
@@ -429,6 +545,23 @@ async def restore_attendance_photos(stats: PhotoRestoreStats, generate_placehold
             stats.errors.append(error_msg)
             stats.add(entity_name, 'errors')
     
+    # Download the queued placeholders
+    if placeholder_jobs:
+        print(f"\n🎨 Generating {len(placeholder_jobs)} attendance placeholder(s)...")
+        # Scan placeholders are interchangeable: download a small pool and copy it to the rest
+        pool_jobs = placeholder_jobs[:ATTENDANCE_PLACEHOLDER_POOL]
+        results = await save_placeholders(pool_jobs)
+        pool = [job[0] for job, saved in zip(pool_jobs, results) if saved]
+        remaining = [job[0] for job in placeholder_jobs[len(pool_jobs):]]
+        if remaining:
+            results += await asyncio.to_thread(copy_placeholders, pool, remaining)
+        for label, saved in zip(placeholder_labels, results):
+            if saved:
+                stats.add(entity_name, 'photos_generated')
+            else:
+                print(f"{label} ❌ Failed to generate placeholder")
+                stats.add(entity_name, 'errors')
+    
     print(f"\n✅ Processed {len(attendance_records)} attendance photos")
 
 
@@ -443,21 +576,22 @@ async def restore_all_photos(backup_path: Optional[Path] = None, generate_placeh
     print("=" * 70)
     print(f"⏰ Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
-    # Find backup file
+    # Find backup file (a path from the directory listing is known to exist; only a given one needs checking)
     if backup_path is None:
         backup_path = get_latest_backup()
+    elif not backup_path.exists():
+        backup_path = None
     
-    if not backup_path or not backup_path.exists():
+    if not backup_path:
         print("❌ No backup file found!")
         stats.errors.append("No backup file found")
         return stats
     
     print(f"\n📦 Loading backup: {backup_path.name}")
     
-    # Load backup data
+    # Load backup data; only users and students are needed, so the rest is never parsed into memory
     try:
-        with open(backup_path, 'r') as f:
-            backup_data = json.load(f)
+        backup_data = {'collections': load_backup_collections(backup_path, ['users', 'students'])}
     except Exception as e:
         print(f"❌ Failed to load backup: {str(e)}")
         stats.errors.append(f"Failed to load backup: {str(e)}")
@@ -496,16 +630,43 @@ async def verify_all_photos():
     
     total_issues = 0
     
+    # Admins, teachers and parents all live in users: fetch them in one query and split by role
+    user_roles = [config['query']['role'] for config in ENTITY_CONFIGS.values() if config['collection'] == 'users']
+    users_by_role: Dict[str, List[Dict]] = {role: [] for role in user_roles}
+    async for user in db.users.find({'role': {'$in': user_roles}}, {'_id': 0, 'user_id': 1, 'name': 1, 'photo': 1, 'role': 1}):
+        users_by_role[user['role']].append(user)
+    
     for entity_name, entity_config in ENTITY_CONFIGS.items():
         print(f"\n{entity_name.upper()}:")
         
         # Get entities from database
-        collection = db[entity_config['collection']]
-        query = entity_config.get('query', {})
-        entities = await collection.find(query).to_list(None)
+        if entity_config['collection'] == 'users':
+            entities = users_by_role[entity_config['query']['role']]
+        else:
+            collection = db[entity_config['collection']]
+            query = entity_config.get('query', {})
+            projection = {'_id': 0, entity_config['id_field']: 1, 'name': 1, 'photo': 1}
+            entities = await collection.find(query, projection).to_list(None)
         
         print(f"   Checking {len(entities)} {entity_name}...")
         
+        # One directory read per entity type instead of a stat per photo
+        has_subdirs = entity_config['has_subdirs']
+        on_disk = list_directory(entity_config['photo_dir'], dirs=has_subdirs)
+        
+        # Student photos sit one level down, so stat them concurrently (latency-bound on network mounts)
+        profile_exists = {}
+        if has_subdirs:
+            ids = [e.get(entity_config['id_field']) for e in entities]
+            ids = [entity_id for entity_id in ids if entity_id in on_disk]
+            with ThreadPoolExecutor(max_workers=PHOTO_STAT_WORKERS) as executor:
+                found = executor.map(lambda entity_id: entity_config['file_path'](entity_id).exists(), ids)
+                profile_exists = dict(zip(ids, found))
+        
+        # Expected paths are prefix + id + suffix; split the format once instead of formatting per entity
+        path_prefix, path_suffix = entity_config['path_format'].split('{id}')
+        
+        # (icon, name, message) tuples; only the first few are ever formatted for printing
         issues = []
         
         for entity in entities:
@@ -515,23 +676,27 @@ async def verify_all_photos():
             
             # Check if photo path is set
             if not photo_path:
-                issues.append(f"❌ {entity_name_display}: No photo path in database")
+                issues.append(("❌", entity_name_display, "No photo path in database"))
                 continue
             
             # Check if photo path is correct format
-            expected_path = entity_config['path_format'].format(id=entity_id)
-            if photo_path != expected_path:
-                issues.append(f"⚠️  {entity_name_display}: Incorrect path - {photo_path}")
+            if not (len(photo_path) >= len(path_prefix) + len(path_suffix)
+                    and photo_path.startswith(path_prefix) and photo_path.endswith(path_suffix)
+                    and photo_path[len(path_prefix):len(photo_path) - len(path_suffix)] == entity_id):
+                issues.append(("⚠️ ", entity_name_display, f"Incorrect path - {photo_path}"))
             
             # Check if actual file exists
-            file_path = entity_config['file_path'](entity_id)
-            if not file_path.exists():
-                issues.append(f"⚠️  {entity_name_display}: File missing")
+            if has_subdirs:
+                file_exists = profile_exists.get(entity_id, False)
+            else:
+                file_exists = entity_config['file_path'](entity_id).name in on_disk
+            if not file_exists:
+                issues.append(("⚠️ ", entity_name_display, "File missing"))
         
         if issues:
             print(f"   ⚠️  Found {len(issues)} issues:")
-            for issue in issues[:3]:
-                print(f"      {issue}")
+            for icon, name, message in issues[:3]:
+                print(f"      {icon} {name}: {message}")
             if len(issues) > 3:
                 print(f"      ... and {len(issues) - 3} more")
             total_issues += len(issues)
@@ -14,6 +14,7 @@ import uuid
 from datetime import datetime, timezone, timedelta
 import random
 import json
+from backup_manager import get_latest_json_backup, load_backup_data
 from typing import Optional, Dict, Any
 
 ROOT_DIR = Path(__file__).parent
@@ -43,16 +44,7 @@ TEST_CREDENTIALS = ""
 
 def get_latest_backup() -> Optional[Path]:
     """Find the most recent backup file"""
-    if not BACKUP_DIR.exists():
-        return None
-    
-    backup_files = list(BACKUP_DIR.glob('seed_backup_*.json'))
-    if not backup_files:
-        return None
-    
-    # Sort by filename (timestamp) in descending order
-    backup_files.sort(reverse=True)
-    return backup_files[0]
+    return get_latest_json_backup('main')
 
 
 async def restore_from_backup(backup_path: Path) -> bool:
@@ -67,8 +59,7 @@ async def restore_from_backup(backup_path: Path) -> bool:
     
     try:
         # Load backup data
-        with open(backup_path, 'r') as f:
-            backup_data = json.load(f)
+        backup_data = load_backup_data(backup_path)
         
         backup_timestamp = backup_data.get('timestamp', 'Unknown')
         print(f"   📅 Backup created: {backup_timestamp}")
@@ -92,10 +83,10 @@ async def restore_from_backup(backup_path: Path) -> bool:
             
             try:
                 # Remove _id field from documents (let MongoDB generate new ones)
-                clean_documents = []
-                for doc in documents:
-                    clean_doc = {k: v for k, v in doc.items() if k != '_id'}
-                    clean_documents.append(clean_doc)
+                # in place: the parsed backup is discarded afterwards, so no per-document copy is needed
+                clean_documents = documents
+                for doc in clean_documents:
+                    doc.pop('_id', None)
                 
                 # Insert documents
                 if clean_documents:
@@ -119,17 +110,7 @@ async def restore_from_backup(backup_path: Path) -> bool:
 
 def get_latest_attendance_backup() -> Optional[Path]:
     """Find the most recent attendance backup file"""
-    attendance_backup_dir = BACKUP_DIR / 'attendance'
-    if not attendance_backup_dir.exists():
-        return None
-    
-    backup_files = list(attendance_backup_dir.glob('attendance_backup_*.json'))
-    if not backup_files:
-        return None
-    
-    # Sort by filename (timestamp) in descending order
-    backup_files.sort(reverse=True)
-    return backup_files[0]
+    return get_latest_json_backup('attendance')
 
 
 async def restore_attendance_from_backup(backup_path: Path) -> bool:
@@ -144,8 +125,7 @@ async def restore_attendance_from_backup(backup_path: Path) -> bool:
     
     try:
         # Load backup data
-        with open(backup_path, 'r') as f:
-            backup_data = json.load(f)
+        backup_data = load_backup_data(backup_path)
         
         backup_timestamp = backup_data.get('timestamp', 'Unknown')
         backup_type = backup_data.get('backup_type', 'Unknown')
@@ -176,10 +156,10 @@ async def restore_attendance_from_backup(backup_path: Path) -> bool:
                 await db[collection_name].delete_many({})
                 
                 # Remove _id field from documents (let MongoDB generate new ones)
-                clean_documents = []
-                for doc in documents:
-                    clean_doc = {k: v for k, v in doc.items() if k != '_id'}
-                    clean_documents.append(clean_doc)
+                # in place: the parsed backup is discarded afterwards, so no per-document copy is needed
+                clean_documents = documents
+                for doc in clean_documents:
+                    doc.pop('_id', None)
                 
                 # Insert documents
                 if clean_documents:
@@ -393,6 +373,8 @@ async def create_students_and_linking(ids_map, route_stop_ids):
     parent_ids = ids_map["parent_ids"]
 
     # generate simplified student objects mapped to parents/teachers/buses/stops
+    # (every student boards at the same sample stop, so look it up once)
+    stop_id = route_stop_ids["route1"][min(1, len(route_stop_ids["route1"]) - 1)]
     students_data = []
     for i, sid in enumerate(student_ids):
         students_data.append({
@@ -407,7 +389,7 @@ async def create_students_and_linking(ids_map, route_stop_ids):
             "parent_id": parent_ids[i % len(parent_ids)],
             "teacher_id": teacher_ids[i % len(teacher_ids)],
             "bus_number": f"BUS-00{(i % 4) + 1}",
-            "stop_id": route_stop_ids["route1"][min(1, len(route_stop_ids["route1"]) - 1)],
+            "stop_id": stop_id,
             "emergency_contact": f"+1-555-91{10+i}",
             "remarks": None
         })
@@ -422,13 +404,18 @@ async def create_attendance_records(student_ids):
     print("=" * 60)
     attendance_records = []
     today = datetime.now(timezone.utc)
+    # One urandom draw covers every possible record (AM + PM per student per day) instead of a syscall per uuid4()
+    rand_pool = os.urandom(16 * 2 * 7 * len(student_ids))
+    attendance_ids = (str(uuid.UUID(bytes=rand_pool[i:i + 16], version=4)) for i in range(0, len(rand_pool), 16))
     for day_offset in range(7):
-        date = (today - timedelta(days=day_offset)).strftime("%Y-%m-%d")
+        day = today - timedelta(days=day_offset)
+        date = day.strftime("%Y-%m-%d")
+        last_update = day.isoformat()
         for student_id in student_ids:
             if random.random() > 0.1:
-                attendance_records.append({"attendance_id": str(uuid.uuid4()), "student_id": student_id, "date": date, "trip": "AM", "status": random.choice(["green", "green", "green", "yellow"]), "confidence": round(random.uniform(0.85, 0.98), 2), "last_update": (today - timedelta(days=day_offset)).isoformat()})
+                attendance_records.append({"attendance_id": next(attendance_ids), "student_id": student_id, "date": date, "trip": "AM", "status": random.choice(["green", "green", "green", "yellow"]), "confidence": round(random.uniform(0.85, 0.98), 2), "last_update": last_update})
             if random.random() > 0.15:
-                attendance_records.append({"attendance_id": str(uuid.uuid4()), "student_id": student_id, "date": date, "trip": "PM", "status": random.choice(["green", "green", "yellow"]), "confidence": round(random.uniform(0.82, 0.96), 2), "last_update": (today - timedelta(days=day_offset)).isoformat()})
+                attendance_records.append({"attendance_id": next(attendance_ids), "student_id": student_id, "date": date, "trip": "PM", "status": random.choice(["green", "green", "yellow"]), "confidence": round(random.uniform(0.82, 0.96), 2), "last_update": last_update})
     await db.attendance.insert_many(attendance_records)
     print(f"✅ Created {len(attendance_records)} attendance records for past 7 days")
 
@@ -437,11 +424,12 @@ async def create_bus_locations_and_holidays(route_stop_samples):
     print("\n" + "=" * 60)
     print("🚌 CREATING BUS LOCATIONS")
     print("=" * 60)
+    timestamp = datetime.now(timezone.utc).isoformat()
     bus_locations = [
-        {"bus_number": "BUS-001", "lat": route_stop_samples[0][1]["lat"], "lon": route_stop_samples[0][1]["lon"], "timestamp": datetime.now(timezone.utc).isoformat()},
-        {"bus_number": "BUS-002", "lat": route_stop_samples[1][0]["lat"], "lon": route_stop_samples[1][0]["lon"], "timestamp": datetime.now(timezone.utc).isoformat()},
-        {"bus_number": "BUS-003", "lat": route_stop_samples[2][1]["lat"], "lon": route_stop_samples[2][1]["lon"], "timestamp": datetime.now(timezone.utc).isoformat()},
-        {"bus_number": "BUS-004", "lat": route_stop_samples[3][2]["lat"], "lon": route_stop_samples[3][2]["lon"], "timestamp": datetime.now(timezone.utc).isoformat()}
+        {"bus_number": "BUS-001", "lat": route_stop_samples[0][1]["lat"], "lon": route_stop_samples[0][1]["lon"], "timestamp": timestamp},
+        {"bus_number": "BUS-002", "lat": route_stop_samples[1][0]["lat"], "lon": route_stop_samples[1][0]["lon"], "timestamp": timestamp},
+        {"bus_number": "BUS-003", "lat": route_stop_samples[2][1]["lat"], "lon": route_stop_samples[2][1]["lon"], "timestamp": timestamp},
+        {"bus_number": "BUS-004", "lat": route_stop_samples[3][2]["lat"], "lon": route_stop_samples[3][2]["lon"], "timestamp": timestamp}
     ]
     for loc in bus_locations:
         await db.bus_locations.insert_one(loc)
@@ -5,6 +5,8 @@ from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
+import logging.handlers
+import queue
 import asyncio
 import subprocess
 from pathlib import Path
@@ -56,6 +58,12 @@ SMTP_FROM = os.environ.get('SMTP_FROM', 'School Bus Tracker <noreply@schoolbustr
 # Photo storage directory
 PHOTO_DIR = ROOT_DIR / 'photos'
 PHOTO_DIR.mkdir(exist_ok=True)
+# Photo sub-directory for each user role
+ROLE_PHOTO_DIRS = {
+    'admin': 'admins',
+    'teacher': 'teachers',
+    'parent': 'parents'
+}
 
 # Email sending utility
 async def send_email(to_email: str, subject: str, body: str):
@@ -414,17 +422,13 @@ def get_photo_url(photo_path: Optional[str]) -> Optional[str]:
     if not photo_path:
         return None
     # Remove 'backend/' prefix if present
-    if photo_path.startswith('backend/'):
-        photo_path = photo_path[8:]  # Remove 'backend/'
+    photo_path = photo_path.removeprefix('backend/')
     # Ensure path starts with /api/photos/
-    if not photo_path.startswith('/api/photos/'):
-        if photo_path.startswith('photos/'):
-            photo_path = '/api/' + photo_path
-        elif photo_path.startswith('/photos/'):
-            photo_path = '/api' + photo_path
-        else:
-            photo_path = '/api/photos/' + photo_path
-    return photo_path
+    if photo_path.startswith('/api/photos/'):
+        return photo_path
+    if photo_path.startswith('/photos/'):
+        return '/api' + photo_path
+    return '/api/photos/' + photo_path.removeprefix('photos/')
 
 # Helper function to normalize timestamps to UTC
 def _normalize_timestamp_to_utc(ts: Optional[str]) -> str:
@@ -518,6 +522,19 @@ async def generate_face_embedding(image_source) -> dict:
         logging.error(f"Error generating face embedding: {str(e)}")
         return {"success": False, "embedding": None, "message": f"Error generating embedding: {str(e)}"}
 
+# Photo file helpers (blocking; called through asyncio.to_thread so uploads don't stall the event loop)
+def save_upload_file(upload: UploadFile, file_path: Path) -> None:
+    """Copy an uploaded file to disk, creating its directory if needed"""
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(upload.file, buffer)
+
+def write_photo_bytes(file_path, data: bytes) -> None:
+    """Write decoded photo bytes to disk, creating its directory if needed"""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "wb") as f:
+        f.write(data)
+
 # Device API Key verification helper
 async def verify_device_key(x_api_key: str = Header(...)):
     """
@@ -719,26 +736,17 @@ async def update_my_photo(file: UploadFile = File(...), current_user: dict = Dep
             raise HTTPException(status_code=400, detail="Invalid image format. Use jpg, jpeg, png, gif, or webp")
         
         # Determine photo directory based on role
-        role_dirs = {
-            'admin': 'admins',
-            'teacher': 'teachers',
-            'parent': 'parents'
-        }
-        role_dir = role_dirs.get(current_user['role'])
+        role_dir = ROLE_PHOTO_DIRS.get(current_user['role'])
         if not role_dir:
             raise HTTPException(status_code=400, detail="Invalid user role")
         
-        # Create role directory if it doesn't exist
+        # Save with user_id as filename (role directory is created if it doesn't exist)
         role_path = PHOTO_DIR / role_dir
-        role_path.mkdir(parents=True, exist_ok=True)
-        
-        # Save with user_id as filename
         file_name = f"{current_user['user_id']}.{file_ext}"
         file_path = role_path / file_name
         
         # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await asyncio.to_thread(save_upload_file, file, file_path)
         
         # Update database
         photo = f"/api/photos/{role_dir}/{file_name}"
@@ -777,17 +785,13 @@ async def update_student_photo(student_id: str, file: UploadFile = File(...), cu
         if file_ext not in ['jpg', 'jpeg', 'png', 'gif', 'webp']:
             raise HTTPException(status_code=400, detail="Invalid image format. Use jpg, jpeg, png, gif, or webp")
         
-        # Create student directory if it doesn't exist
+        # Save as profile.jpg (student directory is created if it doesn't exist)
         student_dir = PHOTO_DIR / 'students' / student_id
-        student_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Save as profile.jpg
         file_name = f"profile.{file_ext}"
         file_path = student_dir / file_name
         
         # Save file FIRST before generating embedding
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await asyncio.to_thread(save_upload_file, file, file_path)
         
         # NOW generate embedding from saved file
         result = await generate_face_embedding(str(file_path))
@@ -893,7 +897,7 @@ async def bulk_generate_embeddings(current_user: dict = Depends(get_current_user
                 {"embedding": None},
                 {"embedding": ""}
             ]
-        }).to_list(length=None)
+        }, {"_id": 0, "student_id": 1, "name": 1, "photo": 1}).to_list(length=None)
         
         if not students:
             return {
@@ -1149,9 +1153,7 @@ async def scan_event(
         photo_path = None
         if request.photo:
             photo_path = f"photos/attendance/{request.student_id}_{today}_{trip}.jpg"
-            os.makedirs(os.path.dirname(photo_path), exist_ok=True)
-            with open(photo_path, "wb") as f:
-                f.write(base64.b64decode(request.photo))
+            await asyncio.to_thread(write_photo_bytes, photo_path, base64.b64decode(request.photo))
 
         # =====================================
         # present == 0  →  Boarding IN (YELLOW)
@@ -1299,12 +1301,21 @@ async def get_attendance(student_id: str, month: str, current_user: dict = Depen
     
     holiday_dates = {h['date'] for h in holidays}
     
+    # Index records by (date, trip) once instead of scanning the month per day; first record wins.
+    # Present sessions are tallied in the same pass rather than re-scanning the records for the summary
+    records_by_slot = {}
+    present_count = 0
+    for r in attendance_records:
+        records_by_slot.setdefault((r['date'], r['trip']), r)
+        if r['status'] in ('yellow', 'green'):
+            present_count += 1
+    
     grid = []
     for day in range(1, last_day + 1):
         date = f"{year}-{month_num}-{day:02d}"
         
-        am_record = next((r for r in attendance_records if r['date'] == date and r['trip'] == 'AM'), None)
-        pm_record = next((r for r in attendance_records if r['date'] == date and r['trip'] == 'PM'), None)
+        am_record = records_by_slot.get((date, 'AM'))
+        pm_record = records_by_slot.get((date, 'PM'))
         
         if date in holiday_dates:
             am_status = "blue"
@@ -1327,7 +1338,6 @@ async def get_attendance(student_id: str, month: str, current_user: dict = Depen
         })
     
     total_days = last_day * 2
-    present_count = sum(1 for r in attendance_records if r['status'] in ['yellow', 'green'])
     
     return {
         "grid": grid,
@@ -2260,19 +2270,22 @@ async def delete_route(route_id: str, current_user: dict = Depends(get_current_u
         )
     
     # Cascade delete: Remove stops that are only used by this route
+    # (one distinct() per collection for all stops instead of two counts per stop)
     stop_ids = route.get('stop_ids', [])
-    for stop_id in stop_ids:
-        # Check if stop is used by other routes
-        other_routes = await db.routes.count_documents({
+    if stop_ids:
+        # Stops used by other routes
+        stops_in_other_routes = await db.routes.distinct("stop_ids", {
             "route_id": {"$ne": route_id},
-            "stop_ids": stop_id
+            "stop_ids": {"$in": stop_ids}
         })
-        # Check if stop is used by students
-        students_using_stop = await db.students.count_documents({"stop_id": stop_id})
+        # Stops used by students
+        stops_with_students = await db.students.distinct("stop_id", {"stop_id": {"$in": stop_ids}})
         
-        # Only delete stop if not used elsewhere
-        if other_routes == 0 and students_using_stop == 0:
-            await db.stops.delete_one({"stop_id": stop_id})
+        # Only delete stops not used elsewhere
+        used_stops = set(stops_in_other_routes) | set(stops_with_students)
+        unused_stops = [stop_id for stop_id in stop_ids if stop_id not in used_stops]
+        if unused_stops:
+            await db.stops.delete_many({"stop_id": {"$in": unused_stops}})
     
     await db.routes.delete_one({"route_id": route_id})
     return {
@@ -2398,13 +2411,18 @@ async def get_backup_status(backup_type: str = "both", current_user: dict = Depe
         from backup_manager import BackupManager
         manager = BackupManager()
         
+        # Status checks hash backups, so they run off the event loop
         if backup_type == "both":
+            main_status, attendance_status = await asyncio.gather(
+                manager.aget_backup_status('main'),
+                manager.aget_backup_status('attendance')
+            )
             result = {
-                'main': manager.get_backup_status('main'),
-                'attendance': manager.get_backup_status('attendance')
+                'main': main_status,
+                'attendance': attendance_status
             }
         else:
-            result = manager.get_backup_status(backup_type)
+            result = await manager.aget_backup_status(backup_type)
         
         return result
     except Exception as e:
@@ -2422,12 +2440,16 @@ async def list_backups(backup_type: str = "both", current_user: dict = Depends(g
         manager = BackupManager()
         
         if backup_type == "both":
+            main_backups, attendance_backups = await asyncio.gather(
+                manager.aget_all_backups('main'),
+                manager.aget_all_backups('attendance')
+            )
             result = {
-                'main': manager.get_all_backups('main'),
-                'attendance': manager.get_all_backups('attendance')
+                'main': main_backups,
+                'attendance': attendance_backups
             }
         else:
-            result = manager.get_all_backups(backup_type)
+            result = await manager.aget_all_backups(backup_type)
         
         return result
     except Exception as e:
@@ -2443,7 +2465,7 @@ async def get_backup_health(current_user: dict = Depends(get_current_user)):
     try:
         from backup_manager import BackupManager
         manager = BackupManager()
-        health_info = manager.get_overall_health()
+        health_info = await manager.aget_overall_health()
         return health_info
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get backup health: {str(e)}")
@@ -2494,21 +2516,16 @@ async def verify_backup(backup_id: str, current_user: dict = Depends(get_current
         raise HTTPException(status_code=403, detail="Access denied")
     
     try:
-        from backup_manager import BackupManager, BACKUP_DIR, ATTENDANCE_BACKUP_DIR
-        from pathlib import Path
+        from backup_manager import BackupManager
         
         manager = BackupManager()
         
-        # Check main backups
-        backup_path = BACKUP_DIR / f"{backup_id}.json"
-        if not backup_path.exists():
-            # Check attendance backups
-            backup_path = ATTENDANCE_BACKUP_DIR / f"{backup_id}.json"
-        
-        if not backup_path.exists():
+        # Check main backups, then attendance backups
+        backup_path = manager.find_backup(backup_id)
+        if backup_path is None:
             raise HTTPException(status_code=404, detail="Backup not found")
         
-        is_valid, message = manager.verify_backup(backup_path)
+        is_valid, message = await manager.averify_backup(backup_path)
         
         return {
             'backup_id': backup_id,
@@ -2529,34 +2546,40 @@ async def restore_backup(backup_id: str, current_user: dict = Depends(get_curren
         raise HTTPException(status_code=403, detail="Access denied")
     
     try:
-        from backup_manager import BackupManager, BACKUP_DIR, ATTENDANCE_BACKUP_DIR
-        from pathlib import Path
-        import json
+        from backup_manager import (
+            BackupManager, ATTENDANCE_BACKUP_DIR, ARCHIVE_EXTENSIONS, MAIN_COLLECTIONS, ATTENDANCE_COLLECTIONS,
+            load_backup_data,
+        )
         
         manager = BackupManager()
         await manager.connect()
         
         try:
-            # Check main backups first
-            backup_path = BACKUP_DIR / f"{backup_id}.json"
-            backup_type = "main"
-            
-            if not backup_path.exists():
-                # Check attendance backups
-                backup_path = ATTENDANCE_BACKUP_DIR / f"{backup_id}.json"
-                backup_type = "attendance"
-            
-            if not backup_path.exists():
+            # Check main backups first, then attendance backups
+            backup_path = manager.find_backup(backup_id)
+            if backup_path is None:
                 raise HTTPException(status_code=404, detail="Backup not found")
+            backup_type = "attendance" if backup_path.parent == ATTENDANCE_BACKUP_DIR else "main"
             
             # Verify backup before restoring
-            is_valid, verify_message = manager.verify_backup(backup_path)
+            is_valid, verify_message = await manager.averify_backup(backup_path)
             if not is_valid:
                 raise HTTPException(status_code=400, detail=f"Backup verification failed: {verify_message}")
             
-            # Load backup data
-            with open(backup_path, 'r') as f:
-                backup_data = json.load(f)
+            # mongodump archives are restored natively by mongorestore
+            if backup_path.name.endswith(ARCHIVE_EXTENSIONS):
+                collection_names = MAIN_COLLECTIONS if backup_type == "main" else ATTENDANCE_COLLECTIONS
+                await manager.restore_archive(backup_path, collection_names)
+                return {
+                    'backup_id': backup_id,
+                    'backup_type': backup_type,
+                    'restored_collections': collection_names,
+                    'backup_date': manager.load_metadata(backup_path).get('timestamp', 'Unknown'),
+                    'message': f"Successfully restored {len(collection_names)} collection(s)"
+                }
+            
+            # Load backup data (decompresses .json.zst backups)
+            backup_data = await asyncio.to_thread(load_backup_data, backup_path)
             
             metadata = backup_data.get('metadata', {})
             collections_data = backup_data.get('data', {})
@@ -2681,10 +2704,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Records are queued by request handlers and written to stderr by a listener thread,
+# so a slow console or pipe never blocks the event loop
+_log_queue = queue.SimpleQueue()
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_listener = logging.handlers.QueueListener(_log_queue, _log_stream_handler)
+_log_queue_handler = logging.handlers.QueueHandler(_log_queue)
+_log_queue_handler.setFormatter(logging.Formatter('%(message)s'))  # Full format is applied by the listener
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    handlers=[_log_queue_handler]
 )
+log_listener.start()
 logger = logging.getLogger(__name__)
 
 # Background task functions
@@ -2720,47 +2752,54 @@ async def check_missed_scans():
     
     RED_STATUS_THRESHOLD = int(os.environ.get('RED_STATUS_THRESHOLD', '10'))
     
-    # Get all students with assigned stops
-    students_cursor = db.students.find({"stop_id": {"$exists": True, "$ne": None}})
+    # Load all stops once and keep those whose expected time + threshold has passed
+    # (one query per cycle instead of a find_one per student)
+    expected_field = 'morning_expected_time' if is_morning else 'evening_expected_time'
+    stops = await db.stops.find({}, {"_id": 0, "stop_id": 1, expected_field: 1}).to_list(None)
+    ready_stops = {}
+    for stop in stops:
+        expected_time_str = stop.get(expected_field)
+        if not expected_time_str:
+            continue
+        
+        # Parse expected time (HH:MM format)
+        try:
+            hour, minute = map(int, expected_time_str.split(':'))
+            expected_datetime = current_time.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            threshold_datetime = expected_datetime + timedelta(minutes=RED_STATUS_THRESHOLD)
+        except (ValueError, AttributeError):
+            continue
+        
+        # Check if we're past the threshold
+        if current_time >= threshold_datetime:
+            ready_stops[stop['stop_id']] = expected_time_str
+    
+    if not ready_stops:
+        return
+    
+    # Get the students at those stops and today's attendance for them in one query each
+    students = await db.students.find(
+        {"stop_id": {"$in": list(ready_stops)}},
+        {"_id": 0, "student_id": 1, "stop_id": 1}
+    ).to_list(None)
+    attendance_records = await db.attendance.find({
+        "date": today,
+        "trip": trip,
+        "student_id": {"$in": [s['student_id'] for s in students]}
+    }, {"_id": 0, "student_id": 1, "status": 1, "last_update": 1}).to_list(None)
+    attendance_by_student = {}
+    for a in attendance_records:
+        attendance_by_student.setdefault(a['student_id'], a)
     
     marked_red_count = 0
     
-    async for student in students_cursor:
+    for student in students:
         try:
             student_id = student['student_id']
-            stop_id = student.get('stop_id')
-            
-            if not stop_id:
-                continue
-            
-            # Get stop with expected times
-            stop = await db.stops.find_one({"stop_id": stop_id}, {"_id": 0})
-            if not stop:
-                continue
-            
-            # Get expected time for current direction
-            expected_time_str = stop.get('morning_expected_time') if is_morning else stop.get('evening_expected_time')
-            if not expected_time_str:
-                continue
-            
-            # Parse expected time (HH:MM format)
-            try:
-                hour, minute = map(int, expected_time_str.split(':'))
-                expected_datetime = current_time.replace(hour=hour, minute=minute, second=0, microsecond=0)
-                threshold_datetime = expected_datetime + timedelta(minutes=RED_STATUS_THRESHOLD)
-            except (ValueError, AttributeError):
-                continue
-            
-            # Check if we're past the threshold
-            if current_time < threshold_datetime:
-                continue
+            expected_time_str = ready_stops[student['stop_id']]
             
             # Check attendance record
-            attendance = await db.attendance.find_one({
-                "student_id": student_id,
-                "date": today,
-                "trip": trip
-            })
+            attendance = attendance_by_student.get(student_id)
             
             if not attendance:
                 # No scan - mark as RED
@@ -2887,6 +2926,13 @@ async def startup_db_seed():
         except Exception as idx_error:
             print(f"ℹ️  Index already exists or creation skipped: {str(idx_error)}")
         
+        # Indexes used by the attendance monitor's per-cycle lookups
+        try:
+            await db.attendance.create_index([("date", 1), ("trip", 1), ("student_id", 1)])
+            await db.students.create_index("stop_id")
+        except Exception as idx_error:
+            print(f"ℹ️  Attendance monitor index creation skipped: {str(idx_error)}")
+        
         # Check if database already has sufficient data before seeding
         users_count = await db.users.count_documents({})
         students_count = await db.students.count_documents({})
@@ -2918,6 +2964,8 @@ async def startup_db_seed():
 @app.on_event("shutdown")
 async def shutdown_db_client():
      client.close()
+     # Flush any queued log records before exit
+     log_listener.stop()
 
 # add collection handle for bus locations
 bus_locations = db["bus_locations"]